@@ -17,7 +17,8 @@ def merge_dicts(defaults, config, cli):
 
 
 default_config = {
-    "log_level": "INFO"
+    "log_level": "INFO",
+    "parallel": 1
 }
 
 
@@ -26,7 +27,10 @@ def create_parser():
 
     parser = ArgumentParser()
     parser.add_argument("-c", "--config", required=True)
-    parser.add_argument("-g", "--granule", required=True)
+    granules = parser.add_mutually_exclusive_group(required=True)
+    granules.add_argument("-g", "--granule")
+    granules.add_argument("-d", "--input-dir")
+    parser.add_argument("-p", "--parallel", type=int)
     parser.add_argument("-o", "--output_file")
     parser.add_argument("--log-file")
     parser.add_argument("--log-level")
@@ -6,7 +6,9 @@ import sys
 import copy
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from glob import glob
 import xarray as xr
 
 from podaac.forge_py.args import parse_args
@@ -42,6 +44,21 @@ def safe_log_args(logger, args):
     logger.debug(f"\nCLI args:\n{object_to_str(args_copy)}\n")
 
 
+def generate_granule_footprint(config_file, local_file):
+    """Return the WKT footprint of a single granule file."""
+
+    strategy, footprint_params = forge.load_footprint_config(config_file)
+    footprint_params["path"] = os.getcwd()
+    # Only lon/lat are read; the file is closed before the footprint is computed
+    with xr.open_dataset(local_file, group=footprint_params.get('group'), decode_times=False) as ds:
+        lon_data = ds[footprint_params['longitude_var']].values
+        lat_data = ds[footprint_params['latitude_var']].values
+
+    return forge.generate_footprint(
+        lon_data, lat_data, strategy=strategy, **footprint_params
+    )
+
+
 def main(args=None):
     """Main script for backfilling from the cli"""
 
@@ -56,23 +73,30 @@ def main(args=None):
     safe_log_args(logger, args)
 
     config_file = args.config
-    local_file = args.granule
-
-    strategy, footprint_params = forge.load_footprint_config(config_file)
-    footprint_params["path"] = os.getcwd()
-    with xr.open_dataset(local_file, group=footprint_params.get('group'), decode_times=False) as ds:
-        lon_data = ds[footprint_params['longitude_var']]
-        lat_data = ds[footprint_params['latitude_var']]
 
-        wkt_representation = forge.generate_footprint(
-            lon_data, lat_data, strategy=strategy, **footprint_params
-        )
+    if args.input_dir:
+        granules = sorted(glob(os.path.join(make_absolute(args.input_dir), '*.nc')))
+    else:
+        granules = [args.granule]
+    config_files = [config_file] * len(granules)
+
+    if args.parallel > 1 and len(granules) > 1:
+        with ProcessPoolExecutor(max_workers=args.parallel) as executor:
+            footprints = list(executor.map(generate_granule_footprint, config_files, granules))
+    else:
+        footprints = list(map(generate_granule_footprint, config_files, granules))
+
+    if args.input_dir:
+        result = {os.path.basename(granule): wkt for granule, wkt in zip(granules, footprints)}
+        for granule, wkt_representation in result.items():
+            print(f"{granule}: {wkt_representation}")
+    else:
+        result = footprints[0]
+        print(result)
 
     if args.output_file:
         with open(args.output_file, "w") as json_file:
-            json.dump(wkt_representation, json_file)
-
-    print(wkt_representation)
+            json.dump(result, json_file)
 
     logger.info(f"Finished forge-py: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}")  # pylint: disable=W1203
 
@@ -1,10 +1,13 @@
 """Python footprint generator"""
 # pylint: disable=unused-argument
 
+import copy
+import functools
 import json
+import os
 from shapely.geometry import Polygon, MultiPolygon
-from shapely.wkt import dumps
-from podaac.forge_py.strategies import open_cv_footprint, alpha_shape_footprint
+import shapely
+from shapely import to_wkt
 
 
 class GroupMismatchError(Exception):
@@ -43,6 +46,18 @@ def find_common_group_and_variables(lon_var, lat_var):
     return lon_group, lon_name, lat_name
 
 
+@functools.lru_cache(maxsize=32)
+def read_config_file(config_file, mtime):
+    """
+    Read and parse a JSON configuration file.
+
+    Results are cached on (config_file, mtime) so a configuration used for many
+    granules is parsed only once, and re-read if the file changes.
+    """
+    with open(config_file, 'rb') as config_f:
+        return json.load(config_f)
+
+
 def load_footprint_config(config_file):
     """
     Load and process the footprint configuration from a JSON file.
@@ -58,8 +73,8 @@ def load_footprint_config(config_file):
         (strategy, config), where `strategy` is the footprint strategy to use,
         and `config` is a dictionary of parameters specific to that strategy.
     """
-    with open(config_file) as config_f:
-        read_config = json.load(config_f)
+    # Copy so callers modifying the returned parameters don't alter the cached config
+    read_config = copy.deepcopy(read_config_file(config_file, os.path.getmtime(config_file)))
 
     # Select the specified strategy and its parameters
     footprint_config = read_config.get('footprint', {})
@@ -122,7 +137,67 @@ def remove_small_polygons(geometry, min_area):
     return result
 
 
-def generate_footprint(lon, lat, strategy=None, is360=False, path=None, **kwargs):
+def make_valid_polygon(geometry):
+    """
+    Repairs an invalid Polygon or MultiPolygon with GEOS MakeValid.
+
+    Only the polygonal parts of the repaired geometry are kept, since MakeValid can
+    also return collapsed lines or points.
+
+    Parameters:
+    ----------
+    geometry : shapely.geometry.Polygon or shapely.geometry.MultiPolygon
+        The invalid input geometry.
+
+    Returns:
+    -------
+    shapely.geometry.Polygon or shapely.geometry.MultiPolygon
+        The valid geometry, or the MakeValid result as-is if it has no polygonal parts.
+    """
+    valid = shapely.make_valid(geometry)
+    if isinstance(valid, (Polygon, MultiPolygon)):
+        return valid
+
+    # Flatten collections (which may contain MultiPolygons) into single parts
+    parts = shapely.get_parts(shapely.get_parts(valid))
+    polygons = [part for part in parts if isinstance(part, Polygon)]
+    if len(polygons) > 1:
+        return MultiPolygon(polygons)
+    if len(polygons) == 1:
+        return polygons[0]
+    return valid
+
+
+def simplify_footprint(geometry, tolerance):
+    """
+    Simplifies a footprint with the Douglas-Peucker algorithm.
+
+    Footprints without holes are simplified with `preserve_topology=False`, which is
+    considerably faster since they have no interior rings or neighbours to keep
+    consistent. If that produces an invalid or empty geometry, or the footprint has
+    holes, the topology preserving simplification is used instead.
+
+    Parameters:
+    ----------
+    geometry : shapely.geometry.Polygon or shapely.geometry.MultiPolygon
+        The footprint to simplify.
+    tolerance : float
+        The simplification tolerance, in degrees.
+
+    Returns:
+    -------
+    shapely.geometry.Polygon or shapely.geometry.MultiPolygon
+        The simplified footprint.
+    """
+    if not shapely.get_num_interior_rings(shapely.get_parts(geometry)).any():
+        simplified = geometry.simplify(tolerance=tolerance, preserve_topology=False)
+        if not simplified.is_empty and simplified.is_valid:
+            return simplified
+
+    return geometry.simplify(tolerance=tolerance, preserve_topology=True)
+
+
+def generate_footprint(lon, lat, strategy=None, is360=False, path=None, precision=None, **kwargs):
     """
     Generates a geographic footprint using a specified strategy.
 
@@ -136,6 +211,9 @@ def generate_footprint(lon, lat, strategy=None, is360=False, path=None, **kwargs
         If True, adjusts longitude values from 0-360 to -180-180 range.
     path : str, optional
         File path for saving output if the strategy requires it.
+    precision : int, optional
+        Number of decimal places the footprint coordinates are written with, or -1 for
+        full precision. Defaults to the strategy's `WKT_PRECISION`.
     **kwargs : dict, optional
         Additional parameters to be passed to the chosen strategy function.
 
@@ -144,23 +222,28 @@ def generate_footprint(lon, lat, strategy=None, is360=False, path=None, **kwargs
     str
         The footprint as a WKT (Well-Known Text) string.
     """
-    # Adjust longitude for 0-360 to -180-180 range if needed
-    if is360:
-        lon = ((lon + 180) % 360.0) - 180
-
-    # Dispatch to the correct footprint strategy based on `strategy`
+    # Dispatch to the correct footprint strategy based on `strategy`. Strategy
+    # modules are imported here so only the dependencies of the chosen one
+    # (opencv or scipy) are loaded.
     if strategy == "open_cv":
-        footprint = open_cv_footprint.footprint_open_cv(lon, lat, path=path, **kwargs)
+        # footprint_open_cv always wraps longitudes to -180-180 itself, after removing fill values
+        from podaac.forge_py.strategies import open_cv_footprint as strategy_module  # pylint: disable=import-outside-toplevel
+        footprint = strategy_module.footprint_open_cv(lon, lat, path=path, **kwargs)
     else:
-        footprint = alpha_shape_footprint.fit_footprint(lon, lat, **kwargs)
+        # fit_footprint adjusts longitude for 0-360 to -180-180 range after removing fill values
+        from podaac.forge_py.strategies import alpha_shape_footprint as strategy_module  # pylint: disable=import-outside-toplevel
+        footprint = strategy_module.fit_footprint(lon, lat, is360=is360, **kwargs)
         if not footprint.is_valid:
-            footprint = footprint.buffer(0)
+            footprint = make_valid_polygon(footprint)
 
     if 'simplify' in kwargs:
-        footprint = footprint.simplify(tolerance=kwargs['simplify'], preserve_topology=True)
+        footprint = simplify_footprint(footprint, kwargs['simplify'])
 
     # Optionally filter small polygons
     if "min_area" in kwargs:
         footprint = remove_small_polygons(footprint, kwargs['min_area'])
 
-    return dumps(footprint, trim=True)
+    # Coordinates are rounded by the GEOS WKT writer
+    if precision is None:
+        precision = strategy_module.WKT_PRECISION
+    return to_wkt(footprint, rounding_precision=precision, trim=True)
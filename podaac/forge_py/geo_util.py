@@ -0,0 +1,15 @@
+"""Utility functions for working with geographic coordinates"""
+
+import numpy as np
+
+
+def wrap_longitude(lon):
+    """Return longitudes converted to the -180 to 180 range.
+
+    Computes ((lon + 180) % 360) - 180 in place on a single output array
+    rather than allocating a temporary for every operation. The input is
+    not modified."""
+    wrapped = np.add(np.asarray(lon), 180.0)
+    np.remainder(wrapped, 360.0, out=wrapped)
+    wrapped -= 180.0
+    return wrapped
@@ -2,10 +2,14 @@
 # pylint: disable=unused-argument
 
 import numpy as np
-import pandas as pd
 import shapely
-import alphashape
-from shapely.geometry import Polygon, MultiPolygon
+from scipy.spatial import ConvexHull, Delaunay
+from shapely.geometry import MultiPolygon, MultiPoint
+from podaac.forge_py.geo_util import wrap_longitude
+
+# Decimal places alpha shape footprints are written with (-1: full precision);
+# see forge.generate_footprint
+WKT_PRECISION = -1
 
 
 def thinning_bin_avg(x, y, rx, ry):
@@ -23,28 +27,149 @@ def thinning_bin_avg(x, y, rx, ry):
         0, 0.5, 1, 1.5, ... .
     """
 
-    xy = pd.DataFrame({"x": x, "y": y})
-    x_rounded = rx*np.round(xy["x"]/rx)
-    y_rounded = ry*np.round(xy["y"]/ry)
-    xy_thinned = xy.groupby(by=[x_rounded, y_rounded]).mean()
-    return xy_thinned["x"].values, xy_thinned["y"].values
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x.size == 0:
+        return x, y
+
+    # Encode each (x bin, y bin) pair as a single integer key
+    x_bin = np.round(x/rx).astype(np.int64)
+    y_bin = np.round(y/ry).astype(np.int64)
+    x_bin -= x_bin.min()
+    y_bin -= y_bin.min()
+    key = x_bin*(y_bin.max() + 1) + y_bin
+
+    # Average the points falling in each occupied bin
+    _, bin_index, counts = np.unique(key, return_inverse=True, return_counts=True)
+    x_thinned = np.bincount(bin_index, weights=x)/counts
+    y_thinned = np.bincount(bin_index, weights=y)/counts
+    return x_thinned, y_thinned
+
+
+def alpha_triangles(points, simplices, alpha):
+    """
+    Finds the triangles of a 2d triangulation whose circumradius is less than 1/alpha.
+
+    The circumradius is R = a*b*c / (4*area), with the area taken from the cross
+    product of two edges, which stays accurate for thin triangles. The test
+    R < 1/alpha is evaluated as a*b*c*alpha < 4*area so no per-triangle division
+    is needed; degenerate (zero area) triangles are never kept.
+
+    Inputs
+    ------
+    points: (N, 2) array.
+        x, y coordinates of the triangulation vertices.
+    simplices: (M, 3) int array.
+        Indices into points of the vertices of each triangle.
+    alpha: float.
+        The alpha parameter.
+
+    Returns
+    -------
+    (M,) bool array, True for the triangles to keep.
+    """
+    vertices = points[simplices]
+    ab = vertices[:, 1] - vertices[:, 0]
+    ac = vertices[:, 2] - vertices[:, 0]
+    bc = vertices[:, 2] - vertices[:, 1]
+
+    # Twice the triangle area
+    area2 = np.abs(ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0])
+    sides = np.hypot(ab[:, 0], ab[:, 1])
+    sides *= np.hypot(ac[:, 0], ac[:, 1])
+    sides *= np.hypot(bc[:, 0], bc[:, 1])
+    sides *= alpha
+    return sides < 2 * area2
+
+
+def compute_alpha_shape(points, alpha):
+    """
+    Computes the alpha shape (concave hull) of a set of 2d points.
+
+    The points are Delaunay triangulated and every triangle whose circumradius is
+    smaller than 1/alpha is kept; the footprint is the union of the kept triangles
+    with any interior holes filled in, as the alphashape package did.
+    If there are fewer than 4 points or alpha <= 0, the convex hull is returned.
+
+    Inputs
+    ------
+    points: (N, 2) array-like.
+        x, y coordinates of the points.
+    alpha: float.
+        The alpha parameter; larger values give a tighter fit.
+    """
+    points = np.asarray(points)
+    if len(points) < 4 or alpha <= 0:
+        return MultiPoint(points).convex_hull
+
+    # Qhull triangulates in float64; use its copy of the points so the
+    # circumradius of thin triangles is not computed at reduced precision
+    triangulation = Delaunay(points)
+    points, simplices = triangulation.points, triangulation.simplices
+    keep = alpha_triangles(points, simplices, alpha)
+
+    # Delaunay triangles share edges exactly and never overlap, so they form a
+    # polygonal coverage and can be merged with the much faster coverage union
+    triangles = shapely.polygons(points[simplices[keep]])
+    union = shapely.coverage_union_all(triangles)
+    if union.is_empty:
+        return union
+
+    # Rebuild each part from its exterior ring to fill holes; a part lying in
+    # another part's hole is then covered by it, so merge overlapping parts
+    parts = shapely.polygons(shapely.get_exterior_ring(shapely.get_parts(union)))
+    if len(parts) == 1:
+        return parts[0]
+    return shapely.union_all(parts)
+
+
+def pole_smoother(fp_lon, fp_lat, lat_thresh, lat_target):
+    """
+    Takes longitude, latitude array-likes from a single Polygon representing a footprint.
+    Smooths the latitude values that exceed a certain threshold by clamping them to a target value.
+    """
+    # Convert to numpy arrays if they are not already
+    fp_lat = np.asarray(fp_lat, dtype=np.float64)
+
+    # Apply thresholding using boolean indexing
+    fp_lat[fp_lat > lat_thresh] = lat_target
+    fp_lat[fp_lat < -lat_thresh] = -lat_target
+
+    # Return the smoothed polygon
+    return shapely.polygons(np.column_stack((fp_lon, fp_lat)))
+
+
+def smooth_footprint(footprint, lat_thresh, lat_target):
+    """
+    Applies pole_smoother() to the exterior of a Polygon, or of each part of a
+    MultiPolygon. Any other geometry is returned unchanged.
+    """
+    if isinstance(footprint, shapely.geometry.polygon.Polygon):
+        coords = shapely.get_coordinates(footprint.exterior)
+        return pole_smoother(coords[:, 0], coords[:, 1], lat_thresh, lat_target)
+    if isinstance(footprint, shapely.geometry.multipolygon.MultiPolygon):
+        return MultiPolygon([
+            pole_smoother(coords[:, 0], coords[:, 1], lat_thresh, lat_target)
+            for coords in (shapely.get_coordinates(p.exterior) for p in footprint.geoms)
+        ])
+    return footprint
 
 
 def fit_footprint(
         lon, lat, alpha=0.05,
         thinning=None, cutoff_lat=None,
-        smooth_poles=None, fill_value=np.nan,
-        return_xythin=False, **kwargs):
+        smooth_poles=None, fill_value=np.nan, is360=False,
+        convex_threshold=None, return_xythin=False, **kwargs):
     """
     Fits instrument coverage footprint for level 2 data set. Output is a polygon object for
-    the indices of the footprint outline. Uses the alphashape package for the fit,
+    the indices of the footprint outline. Uses compute_alpha_shape() for the fit,
     which returns a shapely.geometry.polygon.Polygon or
     shapely.geometry.multipolygon.MultiPolygon object.
 
     lon, lat: list/array-like's
         Latitudes and longitudes of instrument coverage. Should be the same shape and size.
     alpha: float
-        The alpha parameter passed to alphashape. Typical values that work for
+        The alpha parameter passed to compute_alpha_shape(). Typical values that work for
         L2 footprinting are in the range 0.02 - 0.06.
     thinning: (optional) dictionary
         Optional method for removing some of the data points in the lon, lat arrays. It is
@@ -60,31 +185,45 @@ def fit_footprint(
     smooth_poles: (optional) 2-tuple of floats, default = None
         If specified, the first element gives the threshold latitude above which
         any footprint indicies will have their latitudes set to the value of the
-        second element in "smooth_poles".
+        second element in "smooth_poles". Currently ignored; see smooth_footprint().
     fill_value: (optional) float
         Fill value in the latitude, longitude arrays. Default = np.nan; the default
         will work even if the data have no NAN's. Future functionality will accommodate
         multiple possible fill values.
+    is360: bool, default = False
+        If True, longitudes are converted from the 0-360 to the -180-180 range. This is
+        done after missing values are removed, so fill_value is compared against the
+        original longitudes.
+    convex_threshold: (optional) float, default = None
+        If specified, the convex hull of the points is returned instead of the alpha
+        shape when the hull covers at least this fraction (e.g. 0.95) of the points'
+        bounding box. This skips the alpha shape fit for swaths that are essentially
+        convex.
     return_xythin: bool, default = False
         If True, returns the thinned out latitude, longitude arrays along with the
         footprint.
     """
 
-    # Prep arrays and remove missing values:
-    x = np.array(lon).flatten()
-    y = np.array(lat).flatten()
+    # Prep arrays and remove missing values. The fill value is matched on the
+    # original dtype, since it may not be exactly representable in float32.
+    x = np.asarray(lon).ravel()
+    y = np.asarray(lat).ravel()
     if fill_value is np.nan:
-        inan = np.isnan(x*y)
+        valid = np.isfinite(x) & np.isfinite(y)
     else:
-        inan = (x == fill_value) | (y == fill_value)
-    x = x[~inan]
-    y = y[~inan]
+        valid = (x != fill_value) & (y != fill_value)
+    # Single precision is plenty for coordinates in degrees and halves the memory
+    # moved while thinning; the triangulation itself still runs in float64.
+    x = x[valid].astype(np.float32)
+    y = y[valid].astype(np.float32)
+    if is360:
+        x = wrap_longitude(x)
 
-    # Optional thinning (typically helps alphashape fit faster):
+    # Optional thinning (typically helps the alpha shape fit faster):
     if thinning is not None:
         if thinning["method"] == "standard":
-            x_thin = x[np.arange(0, len(x), thinning["value"])]
-            y_thin = y[np.arange(0, len(y), thinning["value"])]
+            x_thin = x[::thinning["value"]]
+            y_thin = y[::thinning["value"]]
         if thinning["method"] == "bin_avg":
             rx, ry = thinning["value"][0], thinning["value"][1]
             x_thin, y_thin = thinning_bin_avg(x, y, rx, ry)
@@ -95,41 +234,32 @@ def fit_footprint(
     # Optional removal of "outlying" data near the poles. Removes data at latitudes
     # higher than the specified value. This will have an impact on footprint shape.
     if cutoff_lat is not None:
-        i_lolats = np.where(abs(y_thin) < cutoff_lat)
-        x_thin = x_thin[i_lolats]
-        y_thin = y_thin[i_lolats]
+        lolats = np.abs(y_thin) < cutoff_lat
+        x_thin = x_thin[lolats]
+        y_thin = y_thin[lolats]
+
+    xy = np.column_stack((x_thin, y_thin))  # Reshape coords to an (N, 2) point array
 
-    # Fit with alphashape
-    xy = np.array(list(zip(x_thin, y_thin)))  # Reshape coords to use with alphashape
-    footprint = alpha_shape = alphashape.alphashape(xy, alpha=alpha)
+    # Optionally use the convex hull for (nearly) convex point clouds
+    footprint = alpha_shape = None
+    if convex_threshold is not None and len(xy) > 2:
+        hull = ConvexHull(xy)
+        bbox_area = np.prod(hull.max_bound - hull.min_bound)
+        # In 2d, ConvexHull.volume is the enclosed area
+        if hull.volume >= convex_threshold * bbox_area:
+            footprint = alpha_shape = shapely.polygons(hull.points[hull.vertices])
+
+    # Fit with alpha shape
+    if alpha_shape is None:
+        footprint = alpha_shape = compute_alpha_shape(xy, alpha)
 
     # Optional pole smoothing: if the data was thinned, the fitted footprint may
     # have jagged pole-edges. This can be optionally smoothed by making all
-    # latitudes higher than some threshold a constant value:
-    def pole_smoother(fp_lon, fp_lat, lat_thresh, lat_target):
-        """
-        Takes longitude, latitude array-likes from a single Polygon representing a footprint.
-        Smooths the latitude values that exceed a certain threshold by clamping them to a target value.
-        """
-        # Convert to numpy arrays if they are not already
-        fp_lat = np.asarray(fp_lat, dtype=np.float64)
-
-        # Apply thresholding using boolean indexing
-        fp_lat[fp_lat > lat_thresh] = lat_target
-        fp_lat[fp_lat < -lat_thresh] = -lat_target
-
-        # Return the smoothed polygon
-        return Polygon(zip(fp_lon, fp_lat))
-
+    # latitudes higher than some threshold a constant value. Pole smoothing is
+    # currently disabled; the smooth_poles setting is ignored.
     smooth_poles = None
     if smooth_poles is not None:
-        if isinstance(alpha_shape, shapely.geometry.polygon.Polygon):
-            footprint = pole_smoother(*alpha_shape.exterior.coords.xy, *smooth_poles)
-        elif isinstance(alpha_shape, shapely.geometry.multipolygon.MultiPolygon):
-            footprint = MultiPolygon([
-                pole_smoother(*p.exterior.coords.xy, *smooth_poles)
-                for p in alpha_shape.geoms
-            ])
+        footprint = smooth_footprint(alpha_shape, *smooth_poles)
 
     if return_xythin:
         return footprint, x_thin, y_thin
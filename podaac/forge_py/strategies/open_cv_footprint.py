@@ -2,30 +2,30 @@
 # pylint: disable=no-member, broad-exception-raised, unused-argument
 
 import uuid
+from collections import defaultdict
 import numpy as np
 import cv2
+import shapely
 from shapely.geometry import Polygon, MultiPolygon
-from PIL import Image
+from podaac.forge_py.geo_util import wrap_longitude
 
+# Decimal places open cv footprints are written with; see forge.generate_footprint
+WKT_PRECISION = 4
 
-def read_and_threshold_image(input_image_path, threshold_value=185):
+
+def threshold_image(image, threshold_value=185):
     """
-    Reads an image from the specified file path, converts it to grayscale, and applies a binary threshold.
+    Applies a binary threshold to a grayscale image.
 
     Parameters:
-    - input_image_path (str): The file path to the input image.
+    - image (ndarray): The grayscale (uint8) input image.
     - threshold_value (int, optional): The threshold value for binarization. Default is 185.
 
     Returns:
-    - img_th (ndarray): The binarized (thresholded) grayscale image.
-
-    Notes:
-    - The function converts the image to grayscale using OpenCV, then applies a binary threshold where pixel values
-      above `threshold_value` are set to 255 (white), and those below are set to 0 (black).
+    - img_th (ndarray): The binarized (thresholded) image, where pixel values above `threshold_value`
+      are set to 255 (white), and those below are set to 0 (black).
     """
-    img = cv2.imread(input_image_path)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, img_th = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
+    _, img_th = cv2.threshold(image, threshold_value, 255, cv2.THRESH_BINARY)
 
     return img_th
 
@@ -48,7 +48,9 @@ def apply_morphological_operations(image, fill_kernel=(20, 20), output_path=None
     """
     kernel = np.ones(fill_kernel, np.uint8)
     img_cleaned = cv2.morphologyEx(image, cv2.MORPH_CLOSE, kernel)  # Fill gaps
-    img_cleaned = cv2.morphologyEx(img_cleaned, cv2.MORPH_OPEN, kernel)  # Remove small noise
+    # The opening is not redundant after the closing (it trims the spurs the closing leaves
+    # behind), so it is kept with the same kernel but applied in place to avoid another copy
+    cv2.morphologyEx(img_cleaned, cv2.MORPH_OPEN, kernel, dst=img_cleaned)  # Remove small noise
 
     # Save the processed image if output_path is provided
     if output_path:
@@ -62,8 +64,8 @@ def pixel_to_lonlat(x, y, width, height):
     Converts pixel coordinates (x, y) in an image to geographic coordinates (longitude, latitude).
 
     Parameters:
-    - x (int): The x-coordinate (horizontal) of the pixel in the image.
-    - y (int): The y-coordinate (vertical) of the pixel in the image.
+    - x (int or ndarray): The x-coordinate(s) (horizontal) of the pixel(s) in the image.
+    - y (int or ndarray): The y-coordinate(s) (vertical) of the pixel(s) in the image.
     - width (int): The width of the image in pixels.
     - height (int): The height of the image in pixels.
 
@@ -91,21 +93,17 @@ def contour_to_lonlat(contour, width, height):
     - height (int): The height of the image in pixels.
 
     Returns:
-    - lonlat_contour (ndarray): An array of contour points in geographic coordinates (longitude, latitude),
-      with the same shape as the input contour.
+    - lonlat_contour (ndarray): An (N, 2) array of contour points in geographic coordinates (longitude, latitude).
 
     Notes:
-    - The function uses `pixel_to_lonlat` to convert each pixel coordinate to longitude and latitude
-      based on the image dimensions.
+    - The function uses `pixel_to_lonlat` to convert all pixel coordinates to longitude and latitude
+      at once based on the image dimensions.
     - This is useful for mapping pixel-based contours onto geographic coordinates in applications
       involving geospatial data.
     """
-    lonlat_contour = []
-    for point in contour:
-        x, y = point[0]  # extract x, y coordinates
-        lon, lat = pixel_to_lonlat(x, y, width, height)
-        lonlat_contour.append([lon, lat])
-    return np.array(lonlat_contour)
+    points = contour.reshape(-1, 2).astype(np.float64)  # extract x, y coordinates
+    lon, lat = pixel_to_lonlat(points[:, 0], points[:, 1], width, height)
+    return np.column_stack((lon, lat))
 
 
 def create_polygon_from_contours(outer_contour, holes, width, height):
@@ -155,19 +153,40 @@ def process_multipolygons(contours, hierarchy, width, height):
     Notes:
     - Outer contours (without a parent) are identified and processed as the main polygon bodies.
     - Inner contours (with the current contour as their parent) are treated as holes for the outer contours.
-    - `create_polygon_from_contours` is used to construct the polygons from pixel coordinates, converting
-      them into geographic coordinates (longitude, latitude).
+    - `create_polygon_from_contours` is used to construct the polygons with holes from pixel coordinates, converting
+      them into geographic coordinates (longitude, latitude). Polygons without holes are built in a single
+      vectorized `shapely.polygons` call.
     - This function is useful for geospatial applications that involve converting image contours into geographic polygons.
     """
+    # Bucket the holes by their parent contour in a single pass
+    children = defaultdict(list)
+    for j, contour in enumerate(contours):
+        if hierarchy[j][3] != -1:
+            children[hierarchy[j][3]].append(contour)
+
     polygons = []
+    simple_positions = []
+    simple_contours = []
     for i, contour in enumerate(contours):
-        if hierarchy[i][3] == -1:  # No parent -> outer contour (possible new polygon)
-            # Find holes for this outer contour
-            holes = [contours[j] for j in range(len(contours)) if hierarchy[j][3] == i]
+        if hierarchy[i][3] != -1:  # Has a parent -> hole, handled with its outer contour
+            continue
+        if i in children:
             # Create polygon for the outer contour and its holes
-            polygon = create_polygon_from_contours(contour, holes, width, height)
+            polygon = create_polygon_from_contours(contour, children[i], width, height)
             if polygon is not None:
                 polygons.append(polygon)
+        elif len(contour) > 2:
+            # Hole-free outer contours are built together below; keep their place in the output
+            simple_positions.append(len(polygons))
+            simple_contours.append(contour)
+            polygons.append(None)
+
+    if simple_contours:
+        coords = contour_to_lonlat(np.concatenate(simple_contours), width, height)
+        indices = np.repeat(np.arange(len(simple_contours)), [len(contour) for contour in simple_contours])
+        simple_polygons = shapely.polygons(shapely.linearrings(coords, indices=indices))
+        for position, polygon in zip(simple_positions, simple_polygons):
+            polygons[position] = polygon
 
     # Return a MultiPolygon if there are multiple polygons, else a single polygon
     if len(polygons) > 1:
@@ -196,104 +215,47 @@ def convert_to_image_coords(lon, lat, image_width=3600, image_height=1800):
     - The function ensures that pixel coordinates are within the bounds of the image dimensions using `np.clip`.
     - This is useful for mapping geographic coordinates onto an image with a specified width and height.
     """
-    # Convert inputs to NumPy arrays if they aren't already
+    # Convert inputs to NumPy arrays, keeping their dtype: coordinates rounded onto a
+    # pixel edge can land in a different pixel if float64 input is scaled in float32
     lon = np.asarray(lon)
     lat = np.asarray(lat)
 
     # Perform vectorized operations
-    img_x = ((lon + 180) * (image_width / 360)).astype(int)
-    img_y = ((90 - lat) * (image_height / 180)).astype(int)
+    img_x = ((lon + 180) * (image_width / 360)).astype(np.int32)
+    img_y = ((90 - lat) * (image_height / 180)).astype(np.int32)
 
     # Ensure coordinates are within bounds
-    img_x = np.clip(img_x, 0, image_width - 1)
-    img_y = np.clip(img_y, 0, image_height - 1)
+    np.clip(img_x, 0, image_width - 1, out=img_x)
+    np.clip(img_y, 0, image_height - 1, out=img_y)
 
     return img_x, img_y
 
 
-def write_image(lat, lon, output_filename, image_width=3600, image_height=1800):
+def build_mask(lat, lon, image_width=3600, image_height=1800):
     """
-    Creates an image from geographic coordinates and saves it as a PNG file.
+    Creates a binary image (mask) from geographic coordinates.
 
     Parameters:
     - lat (float or ndarray): Latitude values of points to plot, either as a single value or an array.
     - lon (float or ndarray): Longitude values of points to plot, either as a single value or an array.
-    - output_filename (str): path to the filename.
     - image_width (int, optional): Width of the image in pixels. Default is 3600.
     - image_height (int, optional): Height of the image in pixels. Default is 1800.
 
     Returns:
-    - None
+    - image (ndarray): A (image_height, image_width) uint8 image.
 
     Notes:
     - This function rounds latitude and longitude values, converts them to image coordinates,
       and creates a binary image where each coordinate point is set to white (255) on a black background.
-    - The image is saved as a PNG file with the specified output filename.
     """
-    # Round lat/lon to two decimal places
-    lon_rounded = np.round(lon, 2)
-    lat_rounded = np.round(lat, 2)
-
-    # Initialize the image array
-    image = np.zeros((image_height, image_width), dtype=np.uint8)
-
-    # Set pixels corresponding to the lat/lon points
-    # Assuming lon_rounded and lat_rounded are numpy arrays
-    lon_rounded = np.array(lon_rounded)
-    lat_rounded = np.array(lat_rounded)
-
-    # Convert coordinates to image indices
-    img_x, img_y = convert_to_image_coords(lon_rounded, lat_rounded, image_width, image_height)
-
-    # Ensure indices are within image dimensions
-    img_x = np.clip(img_x, 0, image_width - 1)
-    img_y = np.clip(img_y, 0, image_height - 1)
-
-    # Create an empty image array
-    image = np.zeros((image_height, image_width), dtype=np.uint8)
+    # Round lat/lon to two decimal places and convert them to (clipped) image indices
+    img_x, img_y = convert_to_image_coords(np.round(lon, 2), np.round(lat, 2), image_width, image_height)
 
     # Set the pixel values to 255 at the calculated coordinates
-    image[img_y, img_x] = 255
-
-    # Save the image
-    result_image = Image.fromarray(image)
-    result_image.save(output_filename)
-
-
-def reduce_precision(geometry, precision=4):
-    """
-    Reduces the precision of the coordinates in a geometric object (Polygon or MultiPolygon)
-    by rounding them to a specified number of decimal places.
-
-    Parameters:
-    - geometry (Polygon or MultiPolygon): The geometric object whose coordinates are to be simplified.
-    - precision (int, optional): The number of decimal places to round the coordinates to.
-      Default is 4.
-
-    Returns:
-    - Polygon or MultiPolygon: A new geometric object with coordinates rounded to the specified precision.
-
-    Raises:
-    - ValueError: If the input geometry is neither a Polygon nor a MultiPolygon.
+    image = np.zeros((image_height, image_width), dtype=np.uint8)
+    image.flat[img_y * image_width + img_x] = 255
 
-    Notes:
-    - This function rounds the coordinates of the exterior and interior rings (if present) of
-      the Polygon or MultiPolygon, allowing for reduced precision while maintaining the overall shape.
-    - Useful for simplifying geometries for storage or display, particularly in applications where
-      exact coordinate precision is less critical.
-    """
-    def round_coords(coords, precision):
-        return [(round(x, precision), round(y, precision)) for x, y in coords]
-
-    if isinstance(geometry, Polygon):
-        exterior = round_coords(geometry.exterior.coords, precision)
-        interiors = [round_coords(interior.coords, precision) for interior in geometry.interiors]
-        return Polygon(exterior, interiors)
-    if isinstance(geometry, MultiPolygon):
-        # Use the .geoms attribute to iterate over individual polygons in the MultiPolygon
-        polygons = [reduce_precision(polygon, precision) for polygon in geometry.geoms]
-        return MultiPolygon(polygons)
-    raise ValueError("Unsupported geometry type")
+    return image
 
 
 def calculate_width_from_height(height):
@@ -311,7 +273,8 @@ def calculate_width_from_height(height):
     return width
 
 
-def footprint_open_cv(lon, lat, pixel_height=1800, path=None, threshold_value=185, fill_kernel=None, fill_value=np.nan, **kwargs):
+def footprint_open_cv(lon, lat, pixel_height=1800, path=None, threshold_value=185, fill_kernel=None, fill_value=np.nan,
+                      debug_path=None, holes=True, **kwargs):
     """
     Main pipeline for processing geographic coordinates to create a footprint polygon using image processing techniques.
 
@@ -323,6 +286,10 @@ def footprint_open_cv(lon, lat, pixel_height=1800, path=None, threshold_value=18
     - threshold_value (int, optional): Threshold value for binarizing the image. Default is 185.
     - fill_value: (float, optional):  Fill value in the latitude, longitude arrays. Default = np.nan; the default
     - fill_kernel (array or tuple of int, optional): The size of the structuring element for morphological operations.
+    - debug_path (str, optional): Directory to save the rasterized and processed images to for debugging.
+      By default the images are only kept in memory.
+    - holes (bool, optional): Whether to keep holes in the footprint. If False, only the outer contours are
+      traced (`cv2.RETR_EXTERNAL`), which skips building the contour hierarchy. Default is True.
 
     Returns:
     - str: Well-Known Text (WKT) representation of the simplified polygon created from the input coordinates.
@@ -332,44 +299,48 @@ def footprint_open_cv(lon, lat, pixel_height=1800, path=None, threshold_value=18
 
     Notes:
     - The function first removes any NaN values from the input longitude and latitude arrays.
-    - It creates an image from the valid latitude and longitude points, processes the image to threshold
+    - It creates an in-memory image from the valid latitude and longitude points, processes the image to threshold
       and clean it, and then extracts contours.
-    - Contours are analyzed to form polygons, which are subsequently simplified and their precision reduced.
-    - The final output is a WKT representation of the polygon, which can be used for geographic data representation.
+    - Contours are analyzed to form polygons. Their precision is not reduced here; `forge.generate_footprint`
+      rounds the coordinates to `WKT_PRECISION` decimal places when serializing the footprint to WKT.
     """
-    new_lon = np.array(lon).flatten()
-    new_lat = np.array(lat).flatten()
-
-    # Ensure longitude is in the range [-180, 180]
-    new_lon = ((new_lon + 180) % 360.0) - 180
+    new_lon = np.asarray(lon).ravel()
+    new_lat = np.asarray(lat).ravel()
 
     # Remove NaNs from lat/lon data
     if fill_value is np.nan:
-        valid_points = ~np.isnan(new_lon * new_lat)
+        valid_points = np.isfinite(new_lon) & np.isfinite(new_lat)
     else:
         valid_points = (new_lon != fill_value) & (new_lat != fill_value)
 
     new_lon = new_lon[valid_points]
     new_lat = new_lat[valid_points]
 
+    # Ensure longitude is in the range [-180, 180]; only the valid points need wrapping,
+    # and fill values are compared before they could be altered by the wrap
+    new_lon = wrap_longitude(new_lon)
+
     pixel_width = calculate_width_from_height(pixel_height)
 
-    # Create and save the image
-    original_filename = f"{path}/image_original_{uuid.uuid4()}.png"
-    processed_filename = f"{path}/image_processed_{uuid.uuid4()}.png"
-    write_image(new_lat, new_lon, original_filename, image_width=pixel_width, image_height=pixel_height)
+    # Create the image in memory, optionally saving it for debugging
+    image = build_mask(new_lat, new_lon, image_width=pixel_width, image_height=pixel_height)
+    processed_filename = None
+    if debug_path:
+        cv2.imwrite(f"{debug_path}/image_original_{uuid.uuid4()}.png", image)
+        processed_filename = f"{debug_path}/image_processed_{uuid.uuid4()}.png"
 
-    img_cleaned = read_and_threshold_image(original_filename, threshold_value)
+    img_cleaned = threshold_image(image, threshold_value)
     if fill_kernel:
         img_cleaned = apply_morphological_operations(img_cleaned, fill_kernel=fill_kernel, output_path=processed_filename)
 
-    contours, hierarchy = cv2.findContours(img_cleaned, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)
+    # Without holes only outer contours are needed; they all have no parent in the hierarchy
+    retrieval_mode = cv2.RETR_CCOMP if holes else cv2.RETR_EXTERNAL
+    contours, hierarchy = cv2.findContours(img_cleaned, retrieval_mode, cv2.CHAIN_APPROX_TC89_KCOS)
     hierarchy = hierarchy[0] if hierarchy is not None else []
 
     polygon_structure = process_multipolygons(contours, hierarchy, pixel_width, pixel_height)
 
     if polygon_structure is not None:
-        reduced_precision = reduce_precision(polygon_structure)
-        return reduced_precision
+        return polygon_structure
 
     raise Exception("No valid polygons found.")
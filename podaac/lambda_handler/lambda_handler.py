@@ -1,13 +1,18 @@
 """lambda function used for footprint generation in aws lambda with cumulus"""
 
+import functools
 import json
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from shutil import rmtree
 import requests
 
+import boto3
 import botocore
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import xarray as xr
 from cumulus_logger import CumulusLogger
 from cumulus_process import Process, s3
@@ -15,20 +20,60 @@ from podaac.forge_py import forge
 
 cumulus_logger = CumulusLogger('forge_py')
 
+# HTTP session kept for the life of the lambda container so warm invocations reuse the connection
+http_session = requests.Session()
+
+# Granule files footprints are generated for, compiled once rather than per file
+PROCESSING_REGEX = re.compile('(.*\\.nc$)')
+
+# Objects over 8 MB are transferred in 8 MB parts over up to 10 threads
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                                 max_concurrency=10, use_threads=True)
+
+# Enough pooled connections for concurrent file workers each running a multipart transfer;
+# keepalive holds pooled connections open across long footprint computations
+S3_CLIENT_CONFIG = Config(max_pool_connections=64, retries={'max_attempts': 10, 'mode': 'adaptive'},
+                          tcp_keepalive=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_s3_client():
+    """ Returns the boto3 s3 client shared by every transfer in this lambda container
+
+    Creating a client is expensive, so it is created on first use and then reused for
+    all files and for later warm invocations. Tests call get_s3_client.cache_clear()
+    so each test gets a client created inside its own mock.
+    """
+    if os.getenv('LOCALSTACK_HOST'):
+        # Same localstack settings as cumulus_process.s3.get_client, plus the client config
+        return boto3.client(
+            's3',
+            region_name='us-east-1',
+            endpoint_url=f"http://{os.getenv('LOCALSTACK_HOST')}:4566",
+            use_ssl=False,
+            aws_access_key_id='fake-key',
+            aws_secret_access_key='fake-secret',
+            config=S3_CLIENT_CONFIG
+        )
+    return boto3.client('s3', config=S3_CLIENT_CONFIG)
+
 
 def clean_tmp(remove_matlibplot=True):
     """ Deletes everything in /tmp """
     temp_folder = '/tmp'
-    temp_files = os.listdir(temp_folder)
 
-    cumulus_logger.info("Removing everything in tmp folder {}".format(temp_files))
-    for filename in os.listdir(temp_folder):
-        file_path = os.path.join(temp_folder, filename)
+    # scandir entries carry their file type, so no extra stat call is needed per entry
+    with os.scandir(temp_folder) as entries:
+        temp_entries = list(entries)
+
+    cumulus_logger.info("Removing everything in tmp folder {}".format([entry.name for entry in temp_entries]))
+    for entry in temp_entries:
+        file_path = entry.path
         try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
+            if entry.is_file() or entry.is_symlink():
                 os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                if filename.startswith('matplotlib'):
+            elif entry.is_dir():
+                if entry.name.startswith('matplotlib'):
                     if remove_matlibplot:
                         rmtree(file_path)
                 else:
@@ -36,8 +81,10 @@ def clean_tmp(remove_matlibplot=True):
         except OSError as ex:
             cumulus_logger.error('Failed to delete %s. Reason: %s' % (file_path, ex))
 
-    temp_files = os.listdir(temp_folder)
-    cumulus_logger.info("After Removing everything in tmp folder {}".format(temp_files))
+    # Listing what is left costs another directory scan, so only do it when debugging
+    if cumulus_logger.logger.isEnabledFor(logging.DEBUG):
+        temp_files = os.listdir(temp_folder)
+        cumulus_logger.debug("After Removing everything in tmp folder {}".format(temp_files))
 
 
 class FootprintGenerator(Process):
@@ -53,26 +100,60 @@ class FootprintGenerator(Process):
         cumulus logger
     config: dictionary
         configuration from cumulus
+    s3_client: botocore.client.S3
+        boto3 s3 client, created on first use and reused for every transfer in the container
 
 
     Methods
     -------
     upload_file_to_s3('/user/test/test.png', 's3://bucket/path/test.fp')
         uploads a local file to s3
+    upload_content_to_s3(b'{"FOOTPRINT": ""}', 's3://bucket/path/test.fp')
+        uploads in-memory content to s3
     process()
         main function ran for footprint generation
     get_config()
         downloads configuration file for footprint
     download_file_from_s3('s3://my-internal-bucket/dataset-config/MODIS_A.2019.cfg', '/tmp/workspace')
         downloads a file from s3 to a directory
+    s3_download('s3://my-internal-bucket/dataset-config/MODIS_A.2019.cfg', '/tmp/workspace')
+        downloads a file from s3 to a directory with the shared s3 client
     """
 
+    # Set once a run has cleaned up /tmp, so the next warm invocation can skip clean_tmp
+    tmp_clean = False
+
     def __init__(self, *args, **kwargs):
 
-        self.processing_regex = '(.*\\.nc$)'
+        self.processing_regex = PROCESSING_REGEX.pattern
         super().__init__(*args, **kwargs)
         self.logger = cumulus_logger
 
+    @property
+    def s3_client(self):
+        """ boto3 s3 client shared by all downloads and uploads """
+        return get_s3_client()
+
+    def s3_download(self, uri, path):
+        """ Download an s3 object into a local directory using the shared client
+
+        Parameters
+        ----------
+        uri: str
+            s3 location of the object  Ex. s3://my-internal-bucket/dataset-config/MODIS_A.2019.cfg
+        path: str
+            local directory the object is downloaded to
+
+        Returns
+        ----------
+        str
+            full path of the downloaded file
+        """
+        s3_uri = s3.uri_parser(uri)
+        local_file = os.path.join(s3.mkdirp(path), s3_uri['filename'])
+        self.s3_client.download_file(s3_uri['bucket'], s3_uri['key'], local_file, Config=TRANSFER_CONFIG)
+        return local_file
+
     def clean_all(self):
         """ Removes anything saved to self.path """
         rmtree(self.path)
@@ -94,7 +175,7 @@ class FootprintGenerator(Process):
             full path of the downloaded file
         """
         try:
-            return s3.download(s3file, working_dir)
+            return self.s3_download(s3file, working_dir)
         except botocore.exceptions.ClientError as ex:
             self.logger.error("Error downloading file %s: %s" % (s3file, working_dir), exc_info=True)
             raise ex
@@ -110,11 +191,33 @@ class FootprintGenerator(Process):
             s3 string of file location
         """
         try:
-            return s3.upload(filename, uri, extra={"ACL": "bucket-owner-full-control"})
+            s3_uri = s3.uri_parser(uri)
+            self.s3_client.upload_file(filename, s3_uri['bucket'], s3_uri['key'],
+                                       ExtraArgs={"ACL": "bucket-owner-full-control"}, Config=TRANSFER_CONFIG)
+            return f's3://{s3_uri["bucket"]}/{s3_uri["key"]}'
         except botocore.exceptions.ClientError as ex:
             self.logger.error("Error uploading file %s: %s" % (os.path.basename(os.path.basename(filename)), str(ex)), exc_info=True)
             raise ex
 
+    def upload_content_to_s3(self, body, uri):
+        """ Upload in-memory content to s3 without writing it to a local file first
+
+        Parameters
+        ----------
+        body: bytes
+            content of the object
+        uri: str
+            s3 string of file location
+        """
+        try:
+            s3_uri = s3.uri_parser(uri)
+            self.s3_client.put_object(Bucket=s3_uri['bucket'], Key=s3_uri['key'], Body=body,
+                                      ACL="bucket-owner-full-control")
+            return f's3://{s3_uri["bucket"]}/{s3_uri["key"]}'
+        except botocore.exceptions.ClientError as ex:
+            self.logger.error("Error uploading file %s: %s" % (s3_uri['filename'], str(ex)), exc_info=True)
+            raise ex
+
     def get_config(self):
         """Get configuration file for footprint generations
         Returns
@@ -129,7 +232,7 @@ class FootprintGenerator(Process):
 
         if config_url:
             file_url = "{}/{}.cfg".format(config_url, config_name)
-            response = requests.get(file_url, timeout=60)
+            response = http_session.get(file_url, timeout=60)
             cfg_file_full_path = "{}/{}.cfg".format(self.path, config_name)
             with open(cfg_file_full_path, 'wb') as file_:
                 file_.write(response.content)
@@ -168,48 +271,46 @@ class FootprintGenerator(Process):
         input_file = f's3://{file_["bucket"]}/{file_["key"]}'
         data_type = file_['type']
 
-        if not re.match(f"{self.processing_regex}", input_file) and data_type != "data":
+        if not PROCESSING_REGEX.match(input_file) and data_type != "data":
             return None
 
         try:
-            local_file = s3.download(input_file, path=self.path)
+            local_file = self.s3_download(input_file, self.path)
         except botocore.exceptions.ClientError as ex:
             self.logger.error("Error downloading granule from s3: {}".format(ex), exc_info=True)
             raise ex
 
         strategy, footprint_params = forge.load_footprint_config(config_file)
         footprint_params["path"] = self.path
+        # Only lon/lat are read; the file is closed before the footprint is computed
         with xr.open_dataset(local_file, group=footprint_params.get('group'), decode_times=False) as ds:
-            lon_data = ds[footprint_params['longitude_var']]
-            lat_data = ds[footprint_params['latitude_var']]
+            lon_data = ds[footprint_params['longitude_var']].values
+            lat_data = ds[footprint_params['latitude_var']].values
 
-            wkt_representation = forge.generate_footprint(
-                lon_data, lat_data, strategy=strategy, **footprint_params
-            )
+        wkt_representation = forge.generate_footprint(
+            lon_data, lat_data, strategy=strategy, **footprint_params
+        )
 
         wkt_json = {
             "FOOTPRINT": wkt_representation,
             "EXTENT": ""
         }
 
-        # Generate json footprint file
+        # Generate json footprint file in memory
         footprint_file_name = f"{granule_id}_{execution_name}.fp"
-        footprint_json_file = os.path.join(self.path, footprint_file_name)
-
-        with open(footprint_json_file, "w") as json_file:
-            json.dump(wkt_json, json_file)
+        footprint_json = json.dumps(wkt_json).encode()
 
         # Upload json footprint file
         upload_file_dict = {
             "key": f'{output_dir}/{collection}/{footprint_file_name}',
             "fileName": footprint_file_name,
             "bucket": output_bucket,
-            "size": os.path.getsize(footprint_json_file),
+            "size": len(footprint_json),
             "type": "metadata",
         }
 
         s3_link = f's3://{upload_file_dict["bucket"]}/{upload_file_dict["key"]}'
-        self.upload_file_to_s3(footprint_json_file, s3_link)
+        self.upload_content_to_s3(footprint_json, s3_link)
 
         return upload_file_dict
 
@@ -239,14 +340,24 @@ class FootprintGenerator(Process):
         granules = self.input['granules']
         append_output = {}
 
+        # Granules can optionally be processed concurrently so S3 transfers overlap with
+        # footprinting. Each open granule costs memory and /tmp space, so this is opt-in.
+        # A granule's files share one footprint key and are always processed in order.
+        max_workers = int(os.environ.get('FORGE_PY_CONCURRENCY', 1))
+
+        def granule_footprints(granule):
+            file_dicts = [self.footprint_generate(file_, config_file_path, granule['granuleId'])
+                          for file_ in granule['files']]
+            return [file_dict for file_dict in file_dicts if file_dict]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for granule, file_dicts in zip(granules, executor.map(granule_footprints, granules)):
+                if file_dicts:
+                    append_output[granule['granuleId']] = append_output.get(granule['granuleId'], []) + file_dicts
+
         for granule in granules:
-            granule_id = granule['granuleId']
-            for file_ in granule['files']:
-                file_dict = self.footprint_generate(file_, config_file_path, granule_id)
-                if file_dict:
-                    append_output[granule_id] = append_output.get(granule_id, []) + [file_dict]
-            if granule_id in append_output:
-                granule['files'] += append_output[granule_id]
+            if granule['granuleId'] in append_output:
+                granule['files'] += append_output[granule['granuleId']]
 
         return self.input
 
@@ -259,12 +370,14 @@ class FootprintGenerator(Process):
     def run(cls, *args, **kwargs):
         """ Run this payload with the given Process class """
         noclean = kwargs.pop('noclean', False)
+        cls.tmp_clean = False
         process = cls(*args, **kwargs)
         try:
             output = process.process()
         finally:
             if not noclean:
                 process.clean_all()
+                cls.tmp_clean = True
         return output
 
 
@@ -295,7 +408,9 @@ def handler(event, context):
     logging_level = os.environ.get('LOGGING_LEVEL', 'info')
     cumulus_logger.logger.level = levels.get(logging_level, 'info')
     cumulus_logger.setMetadata(event, context)
-    clean_tmp()
+    # Cold starts, and runs that did not finish cleaning up, may have left files behind
+    if not FootprintGenerator.tmp_clean:
+        clean_tmp()
     return FootprintGenerator.cumulus_handler(event, context=context)
 
 
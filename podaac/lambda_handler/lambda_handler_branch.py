@@ -13,20 +13,26 @@ from cumulus_logger import CumulusLogger
 
 cumulus_logger = CumulusLogger('forge_branching')
 
+# HTTP session kept for the life of the lambda container so warm invocations reuse the connection
+http_session = requests.Session()
+
 
 def clean_tmp(remove_matlibplot=True):
     """ Deletes everything in /tmp """
     temp_folder = '/tmp'
-    temp_files = os.listdir(temp_folder)
 
-    cumulus_logger.info("Removing everything in tmp folder {}".format(temp_files))
-    for filename in os.listdir(temp_folder):
-        file_path = os.path.join(temp_folder, filename)
+    # scandir entries carry their file type, so no extra stat call is needed per entry
+    with os.scandir(temp_folder) as entries:
+        temp_entries = list(entries)
+
+    cumulus_logger.info("Removing everything in tmp folder {}".format([entry.name for entry in temp_entries]))
+    for entry in temp_entries:
+        file_path = entry.path
         try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
+            if entry.is_file() or entry.is_symlink():
                 os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                if filename.startswith('matplotlib'):
+            elif entry.is_dir():
+                if entry.name.startswith('matplotlib'):
                     if remove_matlibplot:
                         rmtree(file_path)
                 else:
@@ -34,8 +40,10 @@ def clean_tmp(remove_matlibplot=True):
         except OSError as ex:
             cumulus_logger.error('Failed to delete %s. Reason: %s' % (file_path, ex))
 
-    temp_files = os.listdir(temp_folder)
-    cumulus_logger.info("After Removing everything in tmp folder {}".format(temp_files))
+    # Listing what is left costs another directory scan, so only do it when debugging
+    if cumulus_logger.logger.isEnabledFor(logging.DEBUG):
+        temp_files = os.listdir(temp_folder)
+        cumulus_logger.debug("After Removing everything in tmp folder {}".format(temp_files))
 
 
 class FootprintBranch(Process):
@@ -61,6 +69,9 @@ class FootprintBranch(Process):
         downloads configuration file for tig
     """
 
+    # Set once a run has cleaned up /tmp, so the next warm invocation can skip clean_tmp
+    tmp_clean = False
+
     def __init__(self, *args, **kwargs):
 
         self.processing_regex = '(.*\\.nc$)'
@@ -107,7 +118,7 @@ class FootprintBranch(Process):
 
         if config_url:
             file_url = "{}/{}.cfg".format(config_url, config_name)
-            response = requests.get(file_url, timeout=60)
+            response = http_session.get(file_url, timeout=60)
             cfg_file_full_path = "{}/{}.cfg".format(self.path, config_name)
             with open(cfg_file_full_path, 'wb') as file_:
                 file_.write(response.content)
@@ -146,12 +157,14 @@ class FootprintBranch(Process):
     def run(cls, *args, **kwargs):
         """ Run this payload with the given Process class """
         noclean = kwargs.pop('noclean', False)
+        cls.tmp_clean = False
         process = cls(*args, **kwargs)
         try:
             output = process.process()
         finally:
             if not noclean:
                 process.clean_all()
+                cls.tmp_clean = True
         return output
 
 
@@ -182,7 +195,9 @@ def handler(event, context):
     logging_level = os.environ.get('LOGGING_LEVEL', 'info')
     cumulus_logger.logger.level = levels.get(logging_level, 'info')
     cumulus_logger.setMetadata(event, context)
-    clean_tmp()
+    # Cold starts, and runs that did not finish cleaning up, may have left files behind
+    if not FootprintBranch.tmp_clean:
+        clean_tmp()
     result = FootprintBranch.cumulus_handler(event, context=context)
 
     result['meta']['collection']['meta']['workflowChoice']['forge_version'] = result['payload']['forge_version']
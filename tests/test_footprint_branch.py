@@ -4,7 +4,7 @@ import json
 import os
 import boto3
 import pytest
-from jsonschema import validate
+from jsonschema.validators import validator_for
 
 from podaac.lambda_handler import lambda_handler_branch
 from moto import mock_aws
@@ -63,12 +63,16 @@ file_schema = {
   }
 }
 
+# Check and compile the schema once rather than on every validate() call
+file_validator = validator_for(file_schema)(file_schema)
+file_validator.check_schema(file_schema)
+
 class Context:
     def __init__(self, aws_request_id):
         self.aws_request_id = aws_request_id
 
 @mock_aws
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_lambda_handler_cumulus(mocked_get):
     """Test lambda handler to run through cumulus handler"""
 
@@ -83,10 +87,10 @@ def test_lambda_handler_cumulus(mocked_get):
     nc_file = f'{input_dir}/measures_esdr_scatsat_l2_wind_stress_23433_v1.1_s20210228-054653-e20210228-072612.nc'
     cfg_file = f'{config_dir}/PODAAC-CYGNS-C2H10.cfg'
 
-    with open(nc_file, 'rb') as data:
-        aws_s3.Bucket(bucket).put_object(Key='test_folder/test_granule.nc', Body=data)
+    s3_client = boto3.client('s3', region_name='us-east-1')
 
-    s3_client = boto3.client('s3', region_name='us-east-1')    
+    with open(nc_file, 'rb') as data:
+        s3_client.upload_fileobj(data, bucket, 'test_folder/test_granule.nc')
 
     # Mock S3 download here:
     os.environ["CONFIG_BUCKET"] = "internal-bucket"
@@ -98,13 +102,8 @@ def test_lambda_handler_cumulus(mocked_get):
     aws_s3.create_bucket(Bucket='internal-bucket')
 
     with open(cfg_file, 'rb') as data:
-        s3_client.put_object(Bucket='internal-bucket',
-                         Key='dataset-config/JASON-1_L2_OST_GPN_E.cfg',
-                         Body=data)
-
-    s3_client.get_object(Bucket="internal-bucket",
-                         Key='dataset-config/JASON-1_L2_OST_GPN_E.cfg',
-                         )
+        s3_client.upload_fileobj(data, 'internal-bucket',
+                                 'dataset-config/JASON-1_L2_OST_GPN_E.cfg')
 
     dir_path = os.path.dirname(os.path.realpath(__file__))
     input_file = dir_path + '/input.txt'
@@ -114,14 +113,14 @@ def test_lambda_handler_cumulus(mocked_get):
         granules = event.get('payload').get('granules')
         for granule in granules:
             files = granule.get('files')
-            is_valid_shema = validate(instance=files, schema=file_schema)
+            is_valid_shema = file_validator.validate(files)
             assert is_valid_shema is None
 
     context = Context("fake_request_id")
     output = lambda_handler_branch.handler(event, context)
 
     for granule in output.get('payload').get('granules'):
-        is_valid_shema = validate(instance=granule.get('files'), schema=file_schema)
+        is_valid_shema = file_validator.validate(granule.get('files'))
         assert is_valid_shema is None  
 
     assert output['meta']['collection']['meta']['workflowChoice']['forge_version'] == 'forge'
\ No newline at end of file